@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark gateway event handling for prefix commands vs slash commands
+
+Replays the same synthetic guild traffic through discord.py's gateway parsers
+for two bot configurations:
+
+- before: `!` prefix commands.Bot with the message content intent
+- after: AutoShardedBot with slash commands and only the guilds intent
+
+Discord only delivers events the bot has intents for, so chat messages are
+dropped before they reach the "after" bot, just like the real gateway does.
+"""
+
+import time
+import asyncio
+import argparse
+
+import discord
+from discord.ext import commands
+
+BOT_USER = {"id": "99", "username": "bot", "discriminator": "0", "avatar": None, "bot": True}
+AUTHOR = {"id": "3", "username": "user", "discriminator": "0", "avatar": None}
+
+
+def create_message_event(index, content):
+    """Create a MESSAGE_CREATE payload"""
+    return {
+        "id": str(1000 + index),
+        "channel_id": "2",
+        "guild_id": "10",
+        "author": AUTHOR,
+        "content": content,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0
+    }
+
+
+def create_interaction_event(index, name):
+    """Create an INTERACTION_CREATE payload for a slash command"""
+    return {
+        "id": str(1000 + index),
+        "application_id": BOT_USER["id"],
+        "type": 2,
+        "token": "token",
+        "version": 1,
+        "guild_id": "10",
+        "channel_id": "2",
+        "member": {
+            "user": AUTHOR,
+            "roles": [],
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "permissions": "0",
+            "flags": 0
+        },
+        "data": {"id": "7", "name": name, "type": 1},
+        "locale": "en-US",
+        "app_permissions": "0",
+        "entitlements": [],
+        "authorizing_integration_owners": {}
+    }
+
+
+def create_traffic(total_messages, command_every):
+    """
+    Create the guild traffic both bots see
+
+    Returns:
+        List of (index, is_command) tuples, one command per
+        `command_every` messages
+    """
+    return [(index, index % command_every == 0) for index in range(total_messages)]
+
+
+async def run_before(traffic):
+    """Replay traffic through the prefix command bot"""
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = commands.Bot(command_prefix='!', intents=intents)
+    handled = 0
+
+    @bot.command(name='status')
+    async def status(ctx):
+        nonlocal handled
+        handled += 1
+
+    events = [('MESSAGE_CREATE', create_message_event(index, '!status' if is_command else 'gm everyone'))
+              for index, is_command in traffic]
+    return await _replay(bot, events, lambda: handled)
+
+
+async def run_after(traffic):
+    """Replay traffic through the slash command bot"""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    bot = commands.AutoShardedBot(command_prefix=commands.when_mentioned, intents=intents, shard_count=1)
+    handled = 0
+
+    @bot.tree.command(name='status', description='Check your registration status')
+    async def status(interaction: discord.Interaction):
+        nonlocal handled
+        handled += 1
+
+    # Without the guild messages intent the gateway only sends the interactions
+    events = [('INTERACTION_CREATE', create_interaction_event(index, 'status'))
+              for index, is_command in traffic if is_command]
+    return await _replay(bot, events, lambda: handled)
+
+
+async def _replay(bot, events, get_handled):
+    """Feed events through the bot's gateway parsers and wait for handlers"""
+    await bot._async_setup_hook()
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=BOT_USER)
+    parsers = state.parsers
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for event, payload in events:
+        parsers[event](payload)
+        # Let dispatched handlers run, as the gateway reader would between frames
+        await asyncio.sleep(0)
+    current = asyncio.current_task()
+    while any(task is not current for task in asyncio.all_tasks()):
+        await asyncio.sleep(0)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "events": len(events),
+        "commands": get_handled(),
+        "wall": wall,
+        "cpu": cpu
+    }
+
+
+def print_result(label, result, traffic_size):
+    """
+    Print a benchmark result line
+
+    Both bots face the same guild traffic, so throughput is reported as guild
+    messages handled per second of bot-thread CPU and wall time rather than per
+    delivered event (the slash command bot is only delivered the commands).
+    """
+    per_cpu_second = traffic_size / result["cpu"] if result["cpu"] else float('inf')
+    per_wall_second = traffic_size / result["wall"] if result["wall"] else float('inf')
+    print(f"{label:<8} traffic/cpu-s={per_cpu_second:12.0f}  traffic/wall-s={per_wall_second:12.0f}  "
+          f"cpu={result['cpu'] * 1000:9.1f}ms  wall={result['wall'] * 1000:9.1f}ms  "
+          f"delivered={result['events']:>8}  commands={result['commands']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=50000, help='Guild messages to replay')
+    parser.add_argument('--command-every', type=int, default=500, help='One command per this many messages')
+    args = parser.parse_args()
+
+    print("Gateway Event Benchmark")
+    print("=" * 40)
+    print(f"Replaying {args.messages} guild messages, one command per {args.command_every}\n")
+
+    traffic = create_traffic(args.messages, args.command_every)
+    before = asyncio.run(run_before(traffic))
+    after = asyncio.run(run_after(traffic))
+
+    print_result("before", before, len(traffic))
+    print_result("after", after, len(traffic))
+    print(f"\nSame {len(traffic)} guild messages: bot thread CPU "
+          f"{before['cpu'] * 1000:.1f}ms before vs {after['cpu'] * 1000:.1f}ms after "
+          f"({before['cpu'] / max(after['cpu'], 1e-9):.1f}x less), "
+          f"wall {before['wall'] * 1000:.1f}ms vs {after['wall'] * 1000:.1f}ms")
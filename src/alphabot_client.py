@@ -10,6 +10,9 @@ class AlphabotClient:
     
     BASE_URL = "https://api.alphabot.app/v1"
     
+    # Status codes returned for revoked or mistyped API keys
+    AUTH_ERROR_CODES = (401, 403)
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -60,7 +63,7 @@ class AlphabotClient:
             # Handle rate limiting
             if response.status_code == 429:
                 retry_after = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"Rate limited, waiting {retry_after} seconds")
+                logger.warning("Rate limited, waiting %d seconds", retry_after)
                 time.sleep(retry_after)
                 # Retry once after rate limit
                 response = self.session.post(url, json=payload, headers=headers, timeout=30)
@@ -74,21 +77,22 @@ class AlphabotClient:
             # Add status code to result
             result['status_code'] = response.status_code
             
+            # Per-request outcomes are debug only; callers log aggregated results
             if response.status_code == 200:
-                logger.info(f"Successfully registered for raffle {raffle_slug}")
+                logger.debug("Successfully registered for raffle %s", raffle_slug)
             else:
-                logger.warning(f"Failed to register for raffle {raffle_slug}: {result}")
+                logger.debug("Failed to register for raffle %s: %s", raffle_slug, result)
             
             return result
             
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout while registering for raffle {raffle_slug}")
+            logger.debug("Timeout while registering for raffle %s", raffle_slug)
             return {"error": "Request timeout", "success": False}
         except requests.exceptions.RequestException as e:
-            logger.error(f"Request error while registering for raffle {raffle_slug}: {e}")
+            logger.debug("Request error while registering for raffle %s: %s", raffle_slug, e)
             return {"error": str(e), "success": False}
         except Exception as e:
-            logger.error(f"Unexpected error while registering for raffle {raffle_slug}: {e}")
+            logger.error("Unexpected error while registering for raffle %s: %s", raffle_slug, e)
             return {"error": str(e), "success": False}
     
     def get_raffle_info(self, api_key: str, raffle_slug: str) -> Dict[str, Any]:
@@ -130,3 +134,43 @@ class AlphabotClient:
             logger.error(f"Error getting raffle info for {raffle_slug}: {e}")
             return {"error": str(e), "success": False}
 
+    
+    def validate_api_key(self, api_key: str) -> Dict[str, Any]:
+        """
+        Check whether an API key is accepted by Alphabot
+        
+        Args:
+            api_key: Alphabot API key
+            
+        Returns:
+            Dict with 'valid' set to True/False, or None when the check was
+            inconclusive (network error, rate limit, server error), plus
+            'error' and 'status_code' when available
+        """
+        url = f"{self.BASE_URL}/raffles"
+        
+        headers = {
+            'Authorization': f'Bearer {api_key}'
+        }
+        
+        try:
+            response = self.session.get(url, headers=headers, params={'pageSize': 1}, timeout=30)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error validating API key: {e}")
+            return {"valid": None, "error": str(e)}
+        
+        if response.status_code == 200:
+            return {"valid": True, "status_code": response.status_code}
+        
+        try:
+            error = response.json().get('error', response.reason)
+        except (ValueError, AttributeError):
+            error = response.reason
+        
+        valid = False if response.status_code in self.AUTH_ERROR_CODES else None
+        return {"valid": valid, "error": error, "status_code": response.status_code}
+    
+    @classmethod
+    def is_auth_failure(cls, result: Dict[str, Any]) -> bool:
+        """Check whether an API result was rejected because of the API key"""
+        return result.get('status_code') in cls.AUTH_ERROR_CODES
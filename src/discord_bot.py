@@ -1,141 +1,212 @@
 import os
+import json
+import math
+import hashlib
+import asyncio
 import logging
+import datetime
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
 from src.user_storage import UserStorage
 from src.alphabot_client import AlphabotClient
+from src.startup import startup_report
+from src.loop_monitor import LoopLagMonitor
 
 logger = logging.getLogger(__name__)
 
+# The running bot, so other threads (e.g. the webhook) can send DMs
+_active_bot = None
+
+
+def get_active_bot():
+    """Get the running DiscordBot instance, or None if it hasn't started"""
+    return _active_bot
+
+
 class DiscordBot:
     """Discord bot for managing Alphabot raffle entries"""
     
     def __init__(self):
-        # Set up bot intents
-        intents = discord.Intents.default()
-        intents.message_content = True
+        # Commands are slash commands, so the bot only needs guild events;
+        # no message content or per-message gateway traffic
+        intents = discord.Intents.none()
+        intents.guilds = True
+        
+        # Shard count is picked by Discord unless pinned via the environment
+        shard_count = os.environ.get('DISCORD_SHARD_COUNT')
         
         # Create bot instance
-        self.bot = commands.Bot(command_prefix='!', intents=intents)
+        self.bot = commands.AutoShardedBot(
+            command_prefix=commands.when_mentioned,
+            intents=intents,
+            shard_count=int(shard_count) if shard_count else None
+        )
         
         # Initialize storage and API client
         self.user_storage = UserStorage()
         self.alphabot_client = AlphabotClient()
         
+        # Event loop the bot runs on, set once started
+        self.loop = None
+        # Set once start() returns, e.g. after a failed login
+        self.stopped = False
+        self.stop_error = None
+        
+        # Reports how responsive that loop is to /healthz
+        self.lag_monitor = LoopLagMonitor()
+        self._lag_monitor_task = None
+        
         # Set up event handlers and commands
         self._setup_events()
         self._setup_commands()
+        self._setup_tasks()
     
     def _setup_events(self):
         """Set up Discord bot events"""
         
+        async def setup_hook():
+            # Global syncs are rate limited, so only sync when forced or when
+            # the command definitions changed since the last sync
+            fingerprint = self._command_tree_fingerprint()
+            forced = os.environ.get('DISCORD_SYNC_COMMANDS', '').lower() in ('1', 'true', 'yes')
+            if not forced and self._read_synced_fingerprint() == fingerprint:
+                logger.info("Application commands unchanged, skipping sync")
+                return
+            
+            synced = await self.bot.tree.sync()
+            self._write_synced_fingerprint(fingerprint)
+            logger.info(f"Synced {len(synced)} application commands")
+        
+        self.bot.setup_hook = setup_hook
+        
         @self.bot.event
         async def on_ready():
+            startup_report.mark('discord_ready')
             logger.info(f'{self.bot.user} has connected to Discord!')
-            logger.info(f'Bot is in {len(self.bot.guilds)} guilds')
+            logger.info(f'Bot is in {len(self.bot.guilds)} guilds across {self.bot.shard_count} shards')
+            
+            if self.revalidate_keys_task is not None and not self.revalidate_keys_task.is_running():
+                self.revalidate_keys_task.start()
         
-        @self.bot.event
-        async def on_command_error(ctx, error):
-            if isinstance(error, commands.CommandNotFound):
-                return  # Ignore unknown commands
-            elif isinstance(error, commands.MissingRequiredArgument):
-                await ctx.send(f"❌ Missing required argument: {error.param}")
-            elif isinstance(error, commands.BadArgument):
-                await ctx.send(f"❌ Invalid argument: {error}")
+        @self.bot.tree.error
+        async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+            if isinstance(error, app_commands.TransformerError):
+                message = f"❌ Invalid argument: {error}"
             else:
                 logger.error(f"Command error: {error}")
-                await ctx.send("❌ An error occurred while processing your command.")
+                message = "❌ An error occurred while processing your command."
+            
+            if interaction.response.is_done():
+                await interaction.followup.send(message, ephemeral=True)
+            else:
+                await interaction.response.send_message(message, ephemeral=True)
     
     def _setup_commands(self):
         """Set up Discord bot commands"""
         
-        @self.bot.command(name='setapikey', help='Set your Alphabot API key')
-        async def set_api_key(ctx, api_key: str = None):
-            if api_key is None:
-                await ctx.send("❌ Please provide your Alphabot API key: `!setapikey YOUR_API_KEY`")
-                return
-            
+        tree = self.bot.tree
+        
+        @tree.command(name='setapikey', description='Set your Alphabot API key')
+        @app_commands.describe(api_key='Your personal Alphabot API key')
+        async def set_api_key(interaction: discord.Interaction, api_key: str):
             # Basic validation
             if len(api_key) < 10:
-                await ctx.send("❌ API key seems too short. Please check and try again.")
+                await interaction.response.send_message(
+                    "❌ API key seems too short. Please check and try again.", ephemeral=True)
                 return
             
-            user_id = str(ctx.author.id)
+            user_id = str(interaction.user.id)
+            
+            # Validating with Alphabot can outlast the 3 second response window
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            
+            # Check the key with Alphabot before storing it
+            validation = await asyncio.to_thread(self.alphabot_client.validate_api_key, api_key)
+            if validation.get('valid') is False:
+                await interaction.followup.send(
+                    f"❌ Alphabot rejected this API key: {validation.get('error', 'Unauthorized')}", ephemeral=True)
+                return
             
-            # Store the API key
+            # Store the API key; replies are ephemeral so the key is never shown in the channel
             if self.user_storage.set_user_api_key(user_id, api_key):
-                await ctx.send("✅ Your Alphabot API key has been saved successfully!")
-                logger.info(f"User {ctx.author} ({user_id}) set their API key")
-                
-                # Delete the message containing the API key for security
-                try:
-                    await ctx.message.delete()
-                except discord.errors.NotFound:
-                    pass  # Message already deleted
-                except discord.errors.Forbidden:
-                    await ctx.send("⚠️ I couldn't delete your message. Please delete it manually to keep your API key secure.")
+                if validation.get('valid'):
+                    self.user_storage.record_key_success(user_id)
+                await interaction.followup.send("✅ Your Alphabot API key has been saved successfully!", ephemeral=True)
+                logger.info(f"User {interaction.user} ({user_id}) set their API key")
             else:
-                await ctx.send("❌ Failed to save your API key. Please try again.")
+                await interaction.followup.send("❌ Failed to save your API key. Please try again.", ephemeral=True)
         
-        @self.bot.command(name='removekey', help='Remove your stored Alphabot API key')
-        async def remove_api_key(ctx):
-            user_id = str(ctx.author.id)
+        @tree.command(name='removekey', description='Remove your stored Alphabot API key')
+        async def remove_api_key(interaction: discord.Interaction):
+            user_id = str(interaction.user.id)
             
             if self.user_storage.remove_user_api_key(user_id):
-                await ctx.send("✅ Your Alphabot API key has been removed.")
-                logger.info(f"User {ctx.author} ({user_id}) removed their API key")
+                await interaction.response.send_message("✅ Your Alphabot API key has been removed.", ephemeral=True)
+                logger.info(f"User {interaction.user} ({user_id}) removed their API key")
             else:
-                await ctx.send("❌ No API key found for your account.")
+                await interaction.response.send_message("❌ No API key found for your account.", ephemeral=True)
         
-        @self.bot.command(name='status', help='Check your registration status')
-        async def status(ctx):
-            user_id = str(ctx.author.id)
+        @tree.command(name='status', description='Check your registration status')
+        async def status(interaction: discord.Interaction):
+            user_id = str(interaction.user.id)
             
-            if self.user_storage.user_exists(user_id):
-                total_users = self.user_storage.get_user_count()
-                await ctx.send(f"✅ You are registered for automatic raffle entries!\n"
-                             f"📊 Total registered users: {total_users}")
+            key_status = self.user_storage.get_key_status(user_id)
+            if key_status is None:
+                await interaction.response.send_message(
+                    "❌ You are not registered. Use `/setapikey` to get started.", ephemeral=True)
+            elif key_status['status'] == UserStorage.STATUS_QUARANTINED:
+                await interaction.response.send_message(
+                    f"⚠️ Your API key has been paused after repeated authentication failures.\n"
+                    f"Last error: {key_status['last_error']}\n"
+                    f"Use `/setapikey` with a valid key to resume automatic entries.", ephemeral=True)
             else:
-                await ctx.send("❌ You are not registered. Use `!setapikey YOUR_API_KEY` to get started.")
+                total_users = self.user_storage.get_user_count()
+                await interaction.response.send_message(
+                    f"✅ You are registered for automatic raffle entries!\n"
+                    f"🔑 API key status: {key_status['status']}\n"
+                    f"📊 Total registered users: {total_users}", ephemeral=True)
         
-        @self.bot.command(name='joinraffle', help='Manually join a specific raffle')
-        async def join_raffle(ctx, raffle_slug: str = None):
-            if raffle_slug is None:
-                await ctx.send("❌ Please provide a raffle slug: `!joinraffle RAFFLE_SLUG`")
-                return
-            
-            user_id = str(ctx.author.id)
+        @tree.command(name='joinraffle', description='Manually join a specific raffle')
+        @app_commands.describe(raffle_slug='Slug of the raffle to join')
+        async def join_raffle(interaction: discord.Interaction, raffle_slug: str):
+            user_id = str(interaction.user.id)
             api_key = self.user_storage.get_user_api_key(user_id)
             
             if not api_key:
-                await ctx.send("❌ You need to set your API key first: `!setapikey YOUR_API_KEY`")
+                await interaction.response.send_message(
+                    "❌ You need to set your API key first: `/setapikey`", ephemeral=True)
                 return
             
             # Send initial message
-            message = await ctx.send(f"🔄 Attempting to join raffle: `{raffle_slug}`...")
+            await interaction.response.send_message(f"🔄 Attempting to join raffle: `{raffle_slug}`...", ephemeral=True)
             
             try:
-                # Attempt to register for the raffle
-                result = self.alphabot_client.register_for_raffle(
+                # Attempt to register for the raffle off the event loop
+                result = await asyncio.to_thread(
+                    self.alphabot_client.register_for_raffle,
                     api_key=api_key,
                     raffle_slug=raffle_slug,
                     discord_id=user_id
                 )
                 
                 if result.get('success'):
-                    await message.edit(content=f"✅ Successfully joined raffle: `{raffle_slug}`!")
-                    logger.info(f"User {ctx.author} ({user_id}) manually joined raffle {raffle_slug}")
+                    self.user_storage.record_key_success(user_id)
+                    await interaction.edit_original_response(content=f"✅ Successfully joined raffle: `{raffle_slug}`!")
+                    logger.info(f"User {interaction.user} ({user_id}) manually joined raffle {raffle_slug}")
                 else:
                     error_msg = result.get('error', 'Unknown error')
-                    await message.edit(content=f"❌ Failed to join raffle: {error_msg}")
-                    logger.warning(f"User {ctx.author} ({user_id}) failed to join raffle {raffle_slug}: {error_msg}")
+                    self.user_storage.record_key_failure(
+                        user_id, error_msg, auth_failure=self.alphabot_client.is_auth_failure(result))
+                    await interaction.edit_original_response(content=f"❌ Failed to join raffle: {error_msg}")
+                    logger.warning(f"User {interaction.user} ({user_id}) failed to join raffle {raffle_slug}: {error_msg}")
                     
             except Exception as e:
-                await message.edit(content=f"❌ Error joining raffle: {str(e)}")
+                await interaction.edit_original_response(content=f"❌ Error joining raffle: {str(e)}")
                 logger.error(f"Error in manual raffle join for user {user_id}: {e}")
         
-        @self.bot.command(name='bothelp', help='Show available commands')
-        async def help_command(ctx):
+        @tree.command(name='bothelp', description='Show available commands')
+        async def help_command(interaction: discord.Interaction):
             embed = discord.Embed(
                 title="🤖 Alphabot Discord Bot Commands",
                 description="Automatically join Alphabot raffles when they become active!",
@@ -143,50 +214,156 @@ class DiscordBot:
             )
             
             embed.add_field(
-                name="!setapikey <your_key>",
+                name="/setapikey <api_key>",
                 value="Set your personal Alphabot API key for automatic raffle entries",
                 inline=False
             )
             
             embed.add_field(
-                name="!removekey",
+                name="/removekey",
                 value="Remove your stored API key",
                 inline=False
             )
             
             embed.add_field(
-                name="!status",
+                name="/status",
                 value="Check if you're registered and see total user count",
                 inline=False
             )
             
             embed.add_field(
-                name="!joinraffle <slug>",
+                name="/joinraffle <raffle_slug>",
                 value="Manually join a specific raffle by its slug",
                 inline=False
             )
             
             embed.add_field(
                 name="ℹ️ How it works",
-                value="1. Set your API key with `!setapikey`\n"
+                value="1. Set your API key with `/setapikey`\n"
                       "2. The bot will automatically enter you in raffles when they become active\n"
                       "3. You'll receive notifications about entry results",
                 inline=False
             )
             
-            await ctx.send(embed=embed)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    # Fingerprint of the last command tree synced to Discord
+    SYNC_FINGERPRINT_FILE = os.path.join(os.path.dirname(__file__), 'database', 'command_tree.sha256')
+    
+    def _command_tree_fingerprint(self) -> str:
+        """Hash the slash command definitions as they would be sent to Discord"""
+        tree = self.bot.tree
+        payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda c: c['name'])
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def _read_synced_fingerprint(self):
+        """Get the fingerprint of the last synced command tree, or None"""
+        try:
+            with open(self.SYNC_FINGERPRINT_FILE, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+    
+    def _write_synced_fingerprint(self, fingerprint: str):
+        """Remember which command tree was synced"""
+        try:
+            os.makedirs(os.path.dirname(self.SYNC_FINGERPRINT_FILE), exist_ok=True)
+            with open(self.SYNC_FINGERPRINT_FILE, 'w') as f:
+                f.write(fingerprint)
+        except OSError as e:
+            logger.warning(f"Could not save command tree fingerprint: {e}")
+    
+    def _setup_tasks(self):
+        """Set up optional background tasks"""
+        
+        # Off-peak API key re-validation, enabled by setting an hour (UTC)
+        self.revalidate_keys_task = None
+        revalidation_hour = os.environ.get('KEY_REVALIDATION_HOUR')
+        if not revalidation_hour:
+            return
+        
+        try:
+            hour = int(revalidation_hour)
+            if not 0 <= hour <= 23:
+                raise ValueError("hour must be between 0 and 23")
+        except ValueError as e:
+            logger.error(f"Invalid KEY_REVALIDATION_HOUR {revalidation_hour!r} ({e}); key re-validation disabled")
+            return
+        
+        run_at = datetime.time(hour=hour, tzinfo=datetime.timezone.utc)
+        
+        @tasks.loop(time=run_at)
+        async def revalidate_keys():
+            await self.revalidate_api_keys()
+        
+        self.revalidate_keys_task = revalidate_keys
+    
+    async def revalidate_api_keys(self):
+        """Re-check every stored API key, quarantining dead ones and restoring fixed ones"""
+        all_users = self.user_storage.get_all_users()
+        logger.info(f"Re-validating {len(all_users)} API keys")
+        
+        successes = []
+        failures = {}
+        for user_id, api_key in all_users.items():
+            validation = await asyncio.to_thread(self.alphabot_client.validate_api_key, api_key)
+            if validation.get('valid'):
+                successes.append(user_id)
+            elif validation.get('valid') is False:
+                failures[user_id] = (validation.get('error', 'Unauthorized'), True)
+        
+        # One storage write for the whole run
+        results = self.user_storage.record_key_results(successes, failures)
+        for user_id in results['restored']:
+            await self.send_notification(
+                user_id, "✅ Your Alphabot API key is working again. Automatic raffle entries have resumed.")
+        for user_id in results['quarantined']:
+            await self.send_notification(user_id, self.quarantine_message(failures[user_id][0]))
+    
+    @staticmethod
+    def quarantine_message(error: str) -> str:
+        """Build the DM sent to a user when their API key is quarantined"""
+        return (f"⚠️ Your Alphabot API key keeps getting rejected ({error}), so automatic raffle "
+                f"entries have been paused.\nUse `/setapikey` with a valid key to resume.")
+    
+    def notify_key_quarantined(self, user_id: str, error: str):
+        """Tell a user their API key was quarantined; safe to call from any thread"""
+        self.send_notification_threadsafe(user_id, self.quarantine_message(error))
+    
+    def send_notification_threadsafe(self, user_id: str, message: str):
+        """Schedule a direct message on the bot's event loop from another thread"""
+        if self.loop is None or self.stopped or self.loop.is_closed():
+            logger.warning(f"Discord bot not running, could not notify user {user_id}")
+            return
+        asyncio.run_coroutine_threadsafe(self.send_notification(user_id, message), self.loop)
     
     async def start(self):
         """Start the Discord bot"""
+        global _active_bot
+        
         token = os.environ.get('DISCORD_BOT_TOKEN')
         if not token:
             logger.error("DISCORD_BOT_TOKEN environment variable not set")
             return
         
+        self.loop = asyncio.get_running_loop()
+        self._lag_monitor_task = self.lag_monitor.start(self.loop)
+        _active_bot = self
+        
         try:
             await self.bot.start(token)
         except Exception as e:
+            self.stop_error = str(e)
             logger.error(f"Failed to start Discord bot: {e}")
+        finally:
+            # The loop exits with this coroutine; don't let /healthz read that as a stall
+            self.stopped = True
+            self.lag_monitor.stop()
+            self._lag_monitor_task.cancel()
+            try:
+                await self._lag_monitor_task
+            except asyncio.CancelledError:
+                pass
     
     async def send_notification(self, user_id: str, message: str):
         """Send a direct message to a user"""
@@ -200,6 +377,35 @@ class DiscordBot:
         except Exception as e:
             logger.error(f"Error sending notification to user {user_id}: {e}")
     
+    def connection_state(self) -> dict:
+        """
+        Get the bot's Discord connection state; safe to call from any thread
+        
+        Returns:
+            Dict with ready/closed flags, gateway latency, shard latencies and guild count
+        """
+        if self.loop is None:
+            return {'state': 'not_started'}
+        
+        if self.stopped or self.bot.is_closed():
+            state = 'closed'
+        elif self.bot.is_ready():
+            state = 'ready'
+        else:
+            state = 'connecting'
+        
+        def to_ms(latency: float):
+            # Latency is NaN/inf until the first heartbeat is acknowledged
+            return round(latency * 1000, 1) if math.isfinite(latency) else None
+        
+        return {
+            'state': state,
+            'error': self.stop_error,
+            'latency_ms': to_ms(self.bot.latency),
+            'shards': {shard_id: to_ms(latency) for shard_id, latency in list(self.bot.latencies)},
+            'guilds': len(self.bot.guilds)
+        }
+    
     def get_bot_instance(self):
         """Get the bot instance for external use"""
         return self.bot
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+def _stop_listener() -> None:
+    """Flush and stop whichever listener is current at exit"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Registered once; configure_logging may swap listeners many times
+atexit.register(_stop_listener)
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread
+
+    The stock QueueHandler formats every record in the calling thread so it can
+    be pickled; records here never leave the process, so the hot path only pays
+    for enqueueing. Arguments are formatted later, so don't mutate them after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def configure_logging(level: str = None, log_format: str = None) -> None:
+    """
+    Route all logging through a queue drained by a background thread
+
+    Args:
+        level: Root log level, defaults to the LOG_LEVEL env var or INFO
+        log_format: 'json' or 'text', defaults to the LOG_FORMAT env var or json
+    """
+    global _listener
+
+    level = level or os.environ.get('LOG_LEVEL') or 'INFO'
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'json')).lower()
+
+    output = logging.StreamHandler(sys.stdout)
+    if log_format == 'text':
+        output.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    try:
+        set_log_level(level)
+        invalid_level = None
+    except ValueError as e:
+        set_log_level('INFO')
+        invalid_level = e
+
+    _stop_listener()
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    if invalid_level is not None:
+        logging.getLogger(__name__).warning("%s; logging at INFO instead", invalid_level)
+
+def set_log_level(level, logger_name: str = None) -> str:
+    """
+    Change a logger's level at runtime
+
+    Args:
+        level: Level name such as 'DEBUG' or 'WARNING', or a numeric level
+        logger_name: Logger to change, defaults to the root logger
+
+    Returns:
+        The level name now in effect
+
+    Raises:
+        ValueError: If the level is unknown or not a string/int
+    """
+    if isinstance(level, bool) or not isinstance(level, (str, int)):
+        raise ValueError(f"Log level must be a name or number, got {level!r}")
+    if isinstance(level, str):
+        level = level.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Unknown log level: {level}")
+    elif not 0 <= level <= logging.CRITICAL:
+        raise ValueError(f"Log level out of range: {level}")
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(level)
+    return logging.getLevelName(logger.level)
+
+def get_log_levels() -> Dict[str, str]:
+    """Get the levels explicitly set on the root and any named loggers"""
+    levels = {'root': logging.getLevelName(logging.getLogger().level)}
+    for name, logger in logging.Logger.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
+
+class FanoutLogSummary:
+    """
+    Aggregates per-user outcomes of a raffle fan-out into a few log lines
+
+    Instead of one record per user, logs the first few failures individually,
+    one summary line per batch of users and a final summary.
+    """
+
+    def __init__(self, logger: logging.Logger, raffle_slug: str,
+                 batch_size: int = 500, failure_samples: int = 5):
+        self.logger = logger
+        self.raffle_slug = raffle_slug
+        self.batch_size = batch_size
+        self.failure_samples = failure_samples
+        self.started_at = time.perf_counter()
+        self.counts = Counter()
+        self.batch_counts = Counter()
+        self.errors = Counter()
+        self.processed = 0
+        self.batches = 0
+
+    def record_success(self) -> None:
+        """Count a successful registration"""
+        self._record('success')
+
+    def record_failure(self, discord_id: str, error: str, auth_failure: bool = False) -> None:
+        """Count a failed registration, logging it only while under the sample limit"""
+        self.errors[error] += 1
+        failed = self.counts['failed'] + self.counts['auth_failed']
+        if failed < self.failure_samples:
+            self.logger.warning("Failed to register user %s for raffle %s: %s",
+                                discord_id, self.raffle_slug, error,
+                                extra={'raffle': self.raffle_slug, 'discord_id': discord_id})
+        self._record('auth_failed' if auth_failure else 'failed')
+
+    def _record(self, outcome: str) -> None:
+        self.counts[outcome] += 1
+        self.batch_counts[outcome] += 1
+        self.processed += 1
+        if self.processed % self.batch_size == 0:
+            self._flush_batch()
+
+    def _flush_batch(self) -> None:
+        self.batches += 1
+        self.logger.info("Raffle %s batch %d: %s", self.raffle_slug, self.batches, dict(self.batch_counts),
+                         extra={'raffle': self.raffle_slug, 'batch': self.batches,
+                                'counts': dict(self.batch_counts)})
+        self.batch_counts.clear()
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Log the final summary for the fan-out
+
+        Returns:
+            Dict with per-outcome counts, top errors and duration
+        """
+        if self.batch_counts:
+            self._flush_batch()
+        summary = {
+            'raffle': self.raffle_slug,
+            'users': self.processed,
+            'counts': dict(self.counts),
+            'top_errors': dict(self.errors.most_common(3)),
+            'duration_ms': round((time.perf_counter() - self.started_at) * 1000, 1)
+        }
+        self.logger.info("Raffle %s fan-out finished: %d users, %s in %.1fms",
+                         self.raffle_slug, self.processed, dict(self.counts), summary['duration_ms'],
+                         extra=summary)
+        return summary
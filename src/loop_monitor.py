@@ -0,0 +1,112 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from threading import Lock
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class LoopLagMonitor:
+    """Samples how late an asyncio event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval: float = 0.5, window: int = 600):
+        """
+        Args:
+            interval: Seconds between samples
+            window: Number of recent samples kept for percentiles
+        """
+        self.interval = interval
+        self.lock = Lock()
+        self.samples = deque(maxlen=window)
+        self.started_at: Optional[float] = None
+        self.last_sample_at: Optional[float] = None
+        self.stopped = False
+        self.task_count = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> asyncio.Task:
+        """
+        Start sampling on a loop
+
+        The start time is the baseline until the first sample, so a loop
+        that wedges before sampling once still shows up as stalled.
+
+        Args:
+            loop: Event loop to monitor
+
+        Returns:
+            The sampling task
+        """
+        with self.lock:
+            self.started_at = time.monotonic()
+            self.stopped = False
+        return loop.create_task(self.run())
+
+    def stop(self) -> None:
+        """Mark the monitor stopped, e.g. because its loop is exiting, so it stops reporting stalls"""
+        with self.lock:
+            self.stopped = True
+
+    async def run(self):
+        """Sample loop lag forever; run as a task on the loop being monitored"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            task_count = len(asyncio.all_tasks(loop))
+            with self.lock:
+                self.samples.append(lag)
+                self.last_sample_at = time.monotonic()
+                self.task_count = task_count
+
+    def seconds_since_last_sample(self) -> Optional[float]:
+        """
+        Get how long ago the loop last completed a sample
+
+        A loop that is blocked can't take samples, so this grows while it is wedged.
+
+        Returns:
+            Seconds since the last sample (or since start if none was taken yet),
+            or None if the monitor hasn't been started or was stopped
+        """
+        with self.lock:
+            last_sample_at = self.last_sample_at or self.started_at
+            stopped = self.stopped
+        if last_sample_at is None or stopped:
+            return None
+        return time.monotonic() - last_sample_at
+
+    def is_stalled(self, max_stall: float) -> bool:
+        """Check whether the loop has gone more than max_stall seconds without a sample"""
+        since = self.seconds_since_last_sample()
+        return since is not None and since > max_stall
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get lag percentiles over the recent window
+
+        Returns:
+            Dict with p50/p95/p99/max lag in milliseconds, sample count,
+            seconds since the last sample and the number of tasks on the loop
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+            task_count = self.task_count
+        since = self.seconds_since_last_sample()
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            index = min(int(len(samples) * p), len(samples) - 1)
+            return round(samples[index] * 1000, 2)
+
+        return {
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1] * 1000, 2) if samples else None,
+            'samples': len(samples),
+            'seconds_since_last_sample': round(since, 2) if since is not None else None,
+            'tasks': task_count
+        }
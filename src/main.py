@@ -11,28 +11,44 @@ load_dotenv()
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.webhook import webhook_bp
-from src.discord_bot import DiscordBot
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from src.startup import startup_report
+from src.logging_setup import configure_logging
+
+# Logs go through a queue so request threads never block on stdout
+configure_logging()
+
+with startup_report.phase('import flask'):
+    from flask import Flask, request, jsonify
+with startup_report.phase('import models'):
+    from src.models.user import db
+with startup_report.phase('import routes'):
+    from src.routes.user import user_bp
+    from src.routes.webhook import webhook_bp
+    from src.routes.health import health_bp
+    from src.routes.admin import admin_bp
+    from src.static_cache import StaticAssetCache
+
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+with startup_report.phase('create app'):
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(webhook_bp, url_prefix='/webhook')
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(webhook_bp, url_prefix='/webhook')
+    app.register_blueprint(health_bp)
+    app.register_blueprint(admin_bp, url_prefix='/admin')
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    # Database configuration; tables are created on the first /api request
+    database_dir = os.path.join(os.path.dirname(__file__), 'database')
+    os.makedirs(database_dir, exist_ok=True)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(database_dir, 'app.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+with startup_report.phase('load static assets'):
+    # Static files are served from memory, so the healthcheck on / never touches disk
+    static_assets = StaticAssetCache(app.static_folder)
 
 # Discord bot instance
 discord_bot = None
@@ -41,6 +57,9 @@ def start_discord_bot():
     """Start the Discord bot in a separate thread"""
     global discord_bot
     try:
+        # Imported here so discord.py loads off the startup path
+        with startup_report.phase('import discord'):
+            from src.discord_bot import DiscordBot
         discord_bot = DiscordBot()
         # Run the bot in a new event loop
         loop = asyncio.new_event_loop()
@@ -52,28 +71,39 @@ def start_discord_bot():
 @app.route("/test")
 def test_route():
     return "Test route works!"
+
+@app.route("/startup")
+def startup_route():
+    return jsonify(startup_report.to_dict())
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    asset = static_assets.get(path) if path != "" else None
+    if asset is None and path != "" and static_assets.is_uncached_file(path):
+        return static_assets.send_uncached(path)
+    if asset is None:
+        asset = static_assets.get('index.html')
+        if asset is None:
             return "index.html not found", 404
+    return static_assets.make_response(asset, request)
 
 if __name__ == '__main__':
-    # Start Discord bot in a separate thread
-    discord_thread = threading.Thread(target=start_discord_bot, daemon=True)
-    discord_thread.start()
-    
-    # Start Flask app
+    from werkzeug.serving import make_server
+
+    # Bind the port first so webhooks are accepted as early as possible
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    server = make_server('0.0.0.0', port, app, threaded=True)
+    startup_report.mark_listening()
+    startup_report.log()
 
+    # Start Discord bot in a separate thread while the server is already up
+    discord_thread = threading.Thread(target=start_discord_bot, daemon=True, name='discord-bot')
+    discord_thread.start()
+
+    # Start Flask app
+    logger.info(f"Serving on port {port}")
+    server.serve_forever()
@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock, Event
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Innermost Python frames of a thread parked in a blocking call: lock and event
+# waits, selector polls (serve_forever, the asyncio loop) and queue reads
+_IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('handlers.py', 'dequeue'),
+}
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+class StackSampler:
+    """
+    Periodically samples the stacks of every thread in the process
+
+    Threads parked in a known wait are counted in idle_samples rather than
+    recorded, so the output shows where threads were running or blocked on
+    something else (network I/O, sleeps), not the idle pool.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and return folded stack counts"""
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if _is_idle(frame):
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+class ProfileCapture:
+    """
+    One-shot profiler that an admin arms for the next raffle fan-out or for a
+    fixed number of seconds
+
+    Captures stacks of all non-idle threads (Flask workers and the Discord
+    bot thread alike) in folded format, which flamegraph.pl and speedscope read.
+    This is not CPU time: a thread blocked on a socket or in time.sleep still
+    shows up. Costs a single attribute check per raffle when not armed.
+    """
+
+    DEFAULT_INTERVAL = 0.005
+    MIN_INTERVAL = 0.001
+    MAX_SECONDS = 300
+
+    def __init__(self, output_dir: str = None):
+        if output_dir is None:
+            output_dir = os.path.join(os.path.dirname(__file__), 'database', 'profiles')
+        self.output_dir = output_dir
+        self.lock = Lock()
+        self.armed_for_raffle = False
+        self.interval = self.DEFAULT_INTERVAL
+        self.active: Optional[Dict[str, Any]] = None
+        self.last_capture: Optional[Dict[str, Any]] = None
+
+    def arm_next_raffle(self, interval: float = None) -> bool:
+        """
+        Profile the next raffle:active fan-out
+
+        Args:
+            interval: Seconds between stack samples
+
+        Returns:
+            True if armed, False if a capture is already armed or running
+        """
+        with self.lock:
+            if self.armed_for_raffle or self.active:
+                return False
+            self.interval = self._clamp_interval(interval)
+            self.armed_for_raffle = True
+            logger.info("Profiler armed for the next raffle fan-out")
+            return True
+
+    def capture_for(self, seconds: float, interval: float = None) -> bool:
+        """
+        Profile the whole process for a number of seconds, starting now
+
+        Args:
+            seconds: Capture length, capped at MAX_SECONDS
+            interval: Seconds between stack samples
+
+        Returns:
+            True if started, False if a capture is already armed or running
+        """
+        seconds = min(seconds, self.MAX_SECONDS)
+        with self.lock:
+            if self.armed_for_raffle or self.active:
+                return False
+            self.interval = self._clamp_interval(interval)
+            self._start(f"{seconds:g}s")
+
+        timer = threading.Timer(seconds, self._finish)
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _clamp_interval(self, interval: Optional[float]) -> float:
+        """Default the sample interval and keep it from busy-looping the sampler"""
+        return max(interval or self.DEFAULT_INTERVAL, self.MIN_INTERVAL)
+
+    @contextmanager
+    def raffle_capture(self, raffle_slug: str):
+        """Wrap a raffle fan-out; profiles it only if armed"""
+        if not self.armed_for_raffle:
+            yield
+            return
+
+        with self.lock:
+            # Another fan-out may have claimed the capture first
+            claimed = self.armed_for_raffle
+            if claimed:
+                self.armed_for_raffle = False
+                self._start(f"raffle-{raffle_slug}")
+        try:
+            yield
+        finally:
+            if claimed:
+                self._finish()
+
+    def _start(self, label: str) -> None:
+        """Start sampling; call with the lock held"""
+        sampler = StackSampler(self.interval)
+        self.active = {
+            'label': label,
+            'sampler': sampler,
+            'started_at': time.time(),
+            'started': time.perf_counter()
+        }
+        sampler.start()
+        logger.info("Profiler capture %s started", label)
+
+    def _finish(self) -> None:
+        """Stop sampling and write the folded stacks to a file"""
+        with self.lock:
+            active, self.active = self.active, None
+        if active is None:
+            return
+
+        counts = active['sampler'].stop()
+        duration = time.perf_counter() - active['started']
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in active['label'])
+        filename = f"profile-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(active['started_at']))}-{safe_label}.folded"
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, filename), 'w') as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+        except Exception as e:
+            logger.error("Error writing profile %s: %s", filename, e)
+            return
+
+        self.last_capture = {
+            'file': filename,
+            'label': active['label'],
+            'samples': active['sampler'].samples,
+            'idle_thread_samples': active['sampler'].idle_samples,
+            'duration_s': round(duration, 2),
+            'started_at': active['started_at']
+        }
+        logger.info("Profiler capture %s written to %s", active['label'], filename,
+                    extra={'profile': self.last_capture})
+
+    def status(self) -> Dict[str, Any]:
+        """Get whether a capture is armed or running, and the last finished capture"""
+        with self.lock:
+            return {
+                'armed_for_raffle': self.armed_for_raffle,
+                'running': self.active['label'] if self.active else None,
+                'last_capture': self.last_capture
+            }
+
+
+profile_capture = ProfileCapture()
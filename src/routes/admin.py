@@ -0,0 +1,85 @@
+import os
+import hmac
+import math
+import logging
+from functools import wraps
+from flask import Blueprint, request, jsonify, send_from_directory
+
+from src.logging_setup import set_log_level, get_log_levels
+from src.profiler import profile_capture
+
+admin_bp = Blueprint("admin", __name__)
+
+logger = logging.getLogger(__name__)
+
+def admin_required(view):
+    """Require `Authorization: Bearer <ADMIN_API_TOKEN>`; the admin API is off if the token isn't set"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get('ADMIN_API_TOKEN')
+        if not token:
+            return jsonify({"error": "Admin API disabled"}), 404
+
+        auth = request.headers.get('Authorization', '')
+        if not auth.startswith('Bearer ') or not hmac.compare_digest(auth[len('Bearer '):], token):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def _positive_number(value) -> bool:
+    """Check for a finite number above zero; JSON booleans don't count"""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and value > 0)
+
+@admin_bp.route("/log-level", methods=["GET"])
+@admin_required
+def get_log_level():
+    return jsonify(get_log_levels())
+
+@admin_bp.route("/log-level", methods=["PUT"])
+@admin_required
+def update_log_level():
+    data = request.get_json(silent=True) or {}
+    level = data.get('level')
+    if level is None or level == '':
+        return jsonify({"error": "Missing level"}), 400
+    if data.get('logger') is not None and not isinstance(data['logger'], str):
+        return jsonify({"error": "logger must be a string"}), 400
+
+    try:
+        new_level = set_log_level(level, data.get('logger'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logger.warning("Log level of %s set to %s", data.get('logger') or 'root', new_level)
+    return jsonify(get_log_levels())
+
+@admin_bp.route("/profile", methods=["GET"])
+@admin_required
+def get_profile_status():
+    return jsonify(profile_capture.status())
+
+@admin_bp.route("/profile", methods=["POST"])
+@admin_required
+def arm_profiler():
+    # {"mode": "next_raffle"} or {"seconds": 30}; optional "interval_ms" between samples
+    data = request.get_json(silent=True) or {}
+    interval_ms = data.get('interval_ms')
+    interval = interval_ms / 1000 if _positive_number(interval_ms) else None
+
+    seconds = data.get('seconds')
+    if data.get('mode') == 'next_raffle':
+        started = profile_capture.arm_next_raffle(interval)
+    elif _positive_number(seconds):
+        started = profile_capture.capture_for(seconds, interval)
+    else:
+        return jsonify({"error": "Provide mode 'next_raffle' or a positive number of seconds"}), 400
+
+    if not started:
+        return jsonify({"error": "A profile capture is already armed or running"}), 409
+    return jsonify(profile_capture.status()), 202
+
+@admin_bp.route("/profiles/<path:filename>", methods=["GET"])
+@admin_required
+def download_profile(filename):
+    return send_from_directory(profile_capture.output_dir, filename, as_attachment=True)
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import logging
+import threading
+from threading import Lock
+from flask import Blueprint, jsonify
+
+from src.routes.webhook import get_user_storage
+
+health_bp = Blueprint("health", __name__)
+
+logger = logging.getLogger(__name__)
+
+# Readiness fails if the bot's event loop hasn't sampled for this many seconds
+MAX_LOOP_STALL = float(os.environ.get('HEALTH_MAX_LOOP_STALL', 10))
+
+# Checks that fail readiness; the rest are only reported
+READINESS_CHECKS = ('event_loop', 'storage')
+
+# Storage is probed at most this often; /healthz serves the cached result in between
+STORAGE_PROBE_INTERVAL = 10.0
+
+_storage_probe = {'checked_at': None, 'latency_ms': None, 'error': None}
+_storage_probe_lock = Lock()
+
+def probe_storage():
+    """Time a user storage read, reusing the last result if it is recent"""
+    now = time.monotonic()
+    checked_at = _storage_probe['checked_at']
+    if checked_at is not None and now - checked_at < STORAGE_PROBE_INTERVAL:
+        return dict(_storage_probe)
+
+    # Only one request refreshes the probe; others get the previous result
+    if not _storage_probe_lock.acquire(blocking=False):
+        return dict(_storage_probe)
+    try:
+        start = time.perf_counter()
+        try:
+            get_user_storage().ping()
+            error = None
+        except Exception as e:
+            error = str(e)
+        _storage_probe.update({
+            'checked_at': now,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            'error': error
+        })
+        return dict(_storage_probe)
+    finally:
+        _storage_probe_lock.release()
+
+@health_bp.route("/healthz", methods=["GET"])
+def healthz():
+    # Only look at the bot if its module is already loaded; never import discord.py here
+    discord_bot_module = sys.modules.get('src.discord_bot')
+    bot = discord_bot_module.get_active_bot() if discord_bot_module else None
+
+    if bot is not None:
+        loop_lag = bot.lag_monitor.snapshot()
+        discord_state = bot.connection_state()
+        loop_stalled = bot.lag_monitor.is_stalled(MAX_LOOP_STALL)
+    else:
+        loop_lag = None
+        discord_state = {'state': 'not_started'}
+        loop_stalled = False
+
+    storage = probe_storage()
+    storage.pop('checked_at', None)
+
+    checks = {
+        'event_loop': not loop_stalled,
+        'storage': storage['error'] is None,
+        'discord': discord_state['state'] != 'closed'
+    }
+    # A bot that can't log in is reported but doesn't block the webhook server
+    ready = all(checks[name] for name in READINESS_CHECKS)
+    if not all(checks.values()):
+        logger.warning(f"Health check failed: {checks}")
+
+    if not ready:
+        status = 'unavailable'
+    elif not all(checks.values()):
+        status = 'degraded'
+    else:
+        status = 'ok'
+
+    body = {
+        'status': status,
+        'checks': checks,
+        'loop_lag': loop_lag,
+        'discord': discord_state,
+        'queues': {
+            'bot_loop_tasks': loop_lag['tasks'] if loop_lag else None,
+            'threads': threading.active_count()
+        },
+        'storage': storage
+    }
+    return jsonify(body), 200 if ready else 503
@@ -1,12 +1,125 @@
-from flask import Blueprint, jsonify, request
+import json
+from threading import Lock
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+# Page size limits for GET /users
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Largest batch accepted by POST /users/bulk
+MAX_BULK_SIZE = 1000
+
+# Rows fetched per query while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+# Tables are created on first use rather than at import time
+_tables_ready = False
+_tables_lock = Lock()
+
+@user_bp.before_request
+def ensure_tables():
+    global _tables_ready
+    if _tables_ready:
+        return
+    with _tables_lock:
+        if not _tables_ready:
+            db.create_all()
+            _tables_ready = True
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    # Keyset pagination: pass the last id of a page as ?after= to get the next one
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after = request.args.get('after', type=int)
+
+    query = User.query.order_by(User.id)
+    if after is not None:
+        query = query.filter(User.id > after)
+    # Fetch one extra row to know whether there is a next page
+    users = query.limit(limit + 1).all()
+
+    response = jsonify([user.to_dict() for user in users[:limit]])
+    if len(users) > limit:
+        next_cursor = users[limit - 1].id
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{request.base_url}?limit={limit}&after={next_cursor}>; rel="next"'
+    return response
+
+@user_bp.route('/users/export', methods=['GET'])
+def export_users():
+    def generate():
+        # Walk the table in id order, one batch in memory at a time
+        yield '['
+        last_id = 0
+        first = True
+        while True:
+            rows = db.session.execute(
+                db.select(User.id, User.username, User.email)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(EXPORT_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            chunk = ','.join(
+                json.dumps({'id': row.id, 'username': row.username, 'email': row.email})
+                for row in rows
+            )
+            yield chunk if first else ',' + chunk
+            first = False
+            last_id = rows[-1].id
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_upsert_users():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return jsonify({"error": "Expected a JSON array of users"}), 400
+    if len(data) > MAX_BULK_SIZE:
+        return jsonify({"error": f"At most {MAX_BULK_SIZE} users per batch"}), 400
+
+    # Last entry wins if the batch repeats a username
+    entries = {}
+    max_username = User.__table__.c.username.type.length
+    max_email = User.__table__.c.email.type.length
+    for item in data:
+        if not isinstance(item, dict):
+            return jsonify({"error": "Each user must be an object"}), 400
+        username, email = item.get('username'), item.get('email')
+        if not isinstance(username, str) or not 0 < len(username) <= max_username:
+            return jsonify({"error": f"username must be a string of 1-{max_username} characters"}), 400
+        if not isinstance(email, str) or not 0 < len(email) <= max_email:
+            return jsonify({"error": f"email must be a string of 1-{max_email} characters"}), 400
+        entries[username] = email
+
+    # Users matched by username are updated, the rest are created
+    existing = {
+        user.username: user
+        for user in User.query.filter(User.username.in_(list(entries))).all()
+    }
+    created = []
+    for username, email in entries.items():
+        user = existing.get(username)
+        if user is None:
+            user = User(username=username, email=email)
+            db.session.add(user)
+            created.append(user)
+        else:
+            user.email = email
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Batch conflicts with an existing email"}), 409
+
+    return jsonify({"created": len(created), "updated": len(existing)}), 200
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
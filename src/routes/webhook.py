@@ -1,24 +1,47 @@
 import os
+import sys
 import json
 import hmac
 import hashlib
-import asyncio
 import logging
+from threading import Lock
 from flask import Blueprint, request, jsonify
 
-from src.alphabot_client import AlphabotClient
-from src.user_storage import UserStorage
+from src.logging_setup import FanoutLogSummary
+from src.profiler import profile_capture
 
 webhook_bp = Blueprint("webhook", __name__)
 
 logger = logging.getLogger(__name__)
 
-# Initialize AlphabotClient and UserStorage
-alphabot_client = AlphabotClient()
-user_storage = UserStorage()
+# AlphabotClient and UserStorage are created on the first webhook so that
+# importing this module (and binding the port) stays cheap
+_alphabot_client = None
+_user_storage = None
+_init_lock = Lock()
+
+def get_alphabot_client():
+    """Get the shared AlphabotClient, creating it on first use"""
+    global _alphabot_client
+    if _alphabot_client is None:
+        with _init_lock:
+            if _alphabot_client is None:
+                from src.alphabot_client import AlphabotClient
+                _alphabot_client = AlphabotClient()
+    return _alphabot_client
+
+def get_user_storage():
+    """Get the shared UserStorage, creating it on first use"""
+    global _user_storage
+    if _user_storage is None:
+        with _init_lock:
+            if _user_storage is None:
+                from src.user_storage import UserStorage
+                _user_storage = UserStorage()
+    return _user_storage
 
 @webhook_bp.route("/alphabot", methods=["POST"])
-async def alphabot_webhook():
+def alphabot_webhook():
     logger.info("Received Alphabot webhook")
     
     try:
@@ -36,31 +59,56 @@ async def alphabot_webhook():
         if raffle_data:
             raffle_slug = raffle_data.get("slug")
             raffle_name = raffle_data.get("name")
-            logger.info(f"Raffle \'{raffle_name}\' ({raffle_slug}) is active. Attempting to register users.")
+            logger.info("Raffle '%s' (%s) is active. Attempting to register users.", raffle_name, raffle_slug,
+                        extra={'raffle': raffle_slug})
+            
+            alphabot_client = get_alphabot_client()
+            user_storage = get_user_storage()
             
-            all_users = user_storage.get_all_users()
+            # Quarantined keys are skipped so dead requests don't eat rate budget
+            all_users = user_storage.get_active_users()
             if not all_users:
                 logger.info("No users registered to join raffles.")
                 return jsonify({"status": "success", "message": "No users registered"}), 200
 
-            for discord_id, api_key in all_users.items():
-                logger.info(f"Attempting to register user {discord_id} for raffle {raffle_slug}")
-                result = await alphabot_client.register_for_raffle(
-                    api_key=api_key,
-                    raffle_slug=raffle_slug,
-                    discord_id=discord_id
-                )
-                if result.get("success"):
-                    logger.info(f"Successfully registered user {discord_id} for raffle {raffle_slug}")
-                    # TODO: Send Discord DM to user about successful entry
-                else:
-                    error_message = result.get("error", "Unknown error")
-                    logger.error(f"Failed to register user {discord_id} for raffle {raffle_slug}: {error_message}")
-                    # TODO: Send Discord DM to user about failed entry
+            # Profiled only when an admin armed the profiler for the next raffle
+            with profile_capture.raffle_capture(raffle_slug):
+                # Per-user outcomes are aggregated into one log line per batch
+                summary = FanoutLogSummary(logger, raffle_slug)
+                # Key health is written once after the loop, not once per user
+                successes = []
+                failures = {}
+                for discord_id, api_key in all_users.items():
+                    logger.debug("Attempting to register user %s for raffle %s", discord_id, raffle_slug)
+                    result = alphabot_client.register_for_raffle(
+                        api_key=api_key,
+                        raffle_slug=raffle_slug,
+                        discord_id=discord_id
+                    )
+                    if result.get("success"):
+                        summary.record_success()
+                        successes.append(discord_id)
+                        # TODO: Send Discord DM to user about successful entry
+                    else:
+                        error_message = result.get("error", "Unknown error")
+                        auth_failure = alphabot_client.is_auth_failure(result)
+                        summary.record_failure(discord_id, error_message, auth_failure)
+                        failures[discord_id] = (error_message, auth_failure)
+                        # TODO: Send Discord DM to user about failed entry
+                summary.finish()
+                
+                quarantined = user_storage.record_key_results(successes, failures)['quarantined']
+                if quarantined:
+                    # Only notify through a bot that is already loaded; never import discord.py here
+                    discord_bot_module = sys.modules.get('src.discord_bot')
+                    bot = discord_bot_module.get_active_bot() if discord_bot_module else None
+                    if bot:
+                        for discord_id in quarantined:
+                            bot.notify_key_quarantined(discord_id, failures[discord_id][0])
         else:
             logger.warning("raffle:active event received but no raffle data found.")
     else:
-        logger.info(f"Unhandled event type: {event}")
+        logger.info("Unhandled event type: %s", event)
 
     return jsonify({"status": "success"}), 200
 
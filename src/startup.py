@@ -0,0 +1,82 @@
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StartupReport:
+    """Records how long each phase of application startup takes"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.lock = Lock()
+        self.phases: List[Dict[str, Any]] = []
+        self.events: Dict[str, float] = {}
+        self.listening_at: Optional[float] = None
+
+    def _elapsed(self) -> float:
+        """Milliseconds since the report was created"""
+        return (time.perf_counter() - self.started_at) * 1000
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a block of startup work, e.g. importing a subsystem
+
+        Args:
+            name: Label shown in the report
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.phases.append({'name': name, 'ms': round(duration, 1)})
+
+    def mark(self, name: str) -> None:
+        """
+        Record when a startup milestone happened
+
+        Args:
+            name: Milestone name, e.g. 'discord_ready'
+        """
+        with self.lock:
+            self.events.setdefault(name, round(self._elapsed(), 1))
+
+    def mark_listening(self) -> None:
+        """Record that the HTTP server socket is bound and accepting connections"""
+        with self.lock:
+            if self.listening_at is None:
+                self.listening_at = round(self._elapsed(), 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the report as a JSON-serializable dict
+
+        Returns:
+            Dict with import/setup phase timings, time-to-listen and milestones,
+            all in milliseconds since startup began
+        """
+        with self.lock:
+            return {
+                'phases': list(self.phases),
+                'time_to_listen_ms': self.listening_at,
+                'events_ms': dict(self.events),
+                'modules_loaded': len(sys.modules)
+            }
+
+    def log(self) -> None:
+        """Log a one-line summary per phase plus the time-to-listen"""
+        report = self.to_dict()
+        for phase in report['phases']:
+            logger.info(f"Startup phase {phase['name']}: {phase['ms']}ms")
+        logger.info(f"Listening after {report['time_to_listen_ms']}ms "
+                    f"({report['modules_loaded']} modules loaded)")
+
+
+# Created when this module is first imported, which main does before anything heavy
+startup_report = StartupReport()
@@ -0,0 +1,154 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, Optional
+
+from flask import Response, Request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+class StaticAsset:
+    """A static file held in memory with its precompressed variants"""
+
+    def __init__(self, path: str, body: bytes, mimetype: str, cache_control: str):
+        self.path = path
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # Content-Encoding -> body; 'identity' is the uncompressed file
+        self.variants: Dict[str, bytes] = {'identity': body}
+
+class StaticAssetCache:
+    """In-memory static file server with precompression and strong ETags"""
+
+    # Files like app.3f9a1c2e.js or main-3f9a1c2e.css never change content
+    FINGERPRINT_PATTERN = re.compile(r'[.-][0-9a-fA-F]{8,}\.[^.]+$')
+
+    IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+    REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+    # Variants smaller than this aren't worth the Content-Encoding overhead
+    MIN_COMPRESS_SIZE = 256
+
+    # Larger files stay on disk and are streamed instead
+    DEFAULT_MAX_FILE_SIZE = 5 * 1024 * 1024
+
+    COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                          'application/xml', 'image/svg+xml', 'image/x-icon',
+                          'image/vnd.microsoft.icon')
+
+    def __init__(self, static_folder: Optional[str], max_file_size: int = None):
+        self.static_folder = static_folder
+        self.max_file_size = max_file_size or self.DEFAULT_MAX_FILE_SIZE
+        self.assets: Dict[str, StaticAsset] = {}
+        self.uncached = set()
+
+        if static_folder and os.path.isdir(static_folder):
+            self._load()
+
+    def _load(self) -> None:
+        """Read every static file into memory and precompress it"""
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+
+                if os.path.getsize(full_path) > self.max_file_size:
+                    self.uncached.add(path)
+                    continue
+
+                with open(full_path, 'rb') as f:
+                    body = f.read()
+                self.assets[path] = self._build_asset(path, body)
+
+        total = sum(len(v) for asset in self.assets.values() for v in asset.variants.values())
+        logger.info(f"Cached {len(self.assets)} static assets ({total} bytes with compressed variants)")
+
+    def _build_asset(self, path: str, body: bytes) -> StaticAsset:
+        """Create a cached asset, adding gzip/brotli variants for compressible types"""
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.FINGERPRINT_PATTERN.search(path):
+            cache_control = self.IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = self.REVALIDATE_CACHE_CONTROL
+        asset = StaticAsset(path, body, mimetype, cache_control)
+
+        if len(body) < self.MIN_COMPRESS_SIZE or not mimetype.startswith(self.COMPRESSIBLE_TYPES):
+            return asset
+
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+
+        for encoding, data in compressed.items():
+            # Only keep variants that actually save bytes
+            if len(data) < len(body):
+                asset.variants[encoding] = data
+        return asset
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        """
+        Look up a cached asset
+
+        Args:
+            path: Path relative to the static folder
+
+        Returns:
+            The cached asset, or None if it isn't cached
+        """
+        return self.assets.get(path)
+
+    def is_uncached_file(self, path: str) -> bool:
+        """Check whether a path is a static file too large to keep in memory"""
+        return path in self.uncached
+
+    def send_uncached(self, path: str) -> Response:
+        """Stream a static file that isn't held in memory"""
+        return send_from_directory(self.static_folder, path)
+
+    @staticmethod
+    def _choose_encoding(asset: StaticAsset, request: Request) -> str:
+        """Pick the best variant the client accepts"""
+        accepted = request.accept_encodings
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.variants and accepted[encoding]:
+                return encoding
+        return 'identity'
+
+    def make_response(self, asset: StaticAsset, request: Request) -> Response:
+        """
+        Build the response for a cached asset
+
+        Args:
+            asset: Cached asset to serve
+            request: Current request, used for Accept-Encoding and If-None-Match
+
+        Returns:
+            A 200 response with the negotiated variant, or a 304 if the
+            client's ETag still matches
+        """
+        encoding = self._choose_encoding(asset, request)
+        # Strong ETags must differ between encodings of the same file
+        etag = asset.etag if encoding == 'identity' else f"{asset.etag}-{encoding}"
+
+        headers = {
+            'ETag': f'"{etag}"',
+            'Cache-Control': asset.cache_control
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
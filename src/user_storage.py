@@ -1,44 +1,105 @@
 import json
 import os
+import time
 import logging
-from typing import Dict, Optional
+import tempfile
+from typing import Dict, Optional, Any, Iterable, List, Tuple
 from threading import Lock
 
 logger = logging.getLogger(__name__)
 
+# One lock per storage file, shared by every UserStorage instance using it
+# (the webhook and the Discord bot thread each create their own instance)
+_file_locks: Dict[str, Lock] = {}
+_file_locks_guard = Lock()
+
+def _lock_for(path: str) -> Lock:
+    """Get the process-wide lock for a storage file"""
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), Lock())
+
 class UserStorage:
     """Simple file-based storage for user API keys"""
     
-    def __init__(self, storage_file: str = None):
+    # Key health states
+    STATUS_UNVERIFIED = 'unverified'
+    STATUS_VALID = 'valid'
+    STATUS_QUARANTINED = 'quarantined'
+    
+    # Consecutive auth failures (401/403) before a key is quarantined
+    DEFAULT_QUARANTINE_THRESHOLD = 3
+    
+    def __init__(self, storage_file: str = None, quarantine_threshold: int = None):
         if storage_file is None:
             # Default to a file in the database directory
             base_dir = os.path.dirname(__file__)
             storage_file = os.path.join(base_dir, 'database', 'user_keys.json')
         
         self.storage_file = storage_file
-        self.lock = Lock()
+        self.lock = _lock_for(storage_file)
+        
+        if quarantine_threshold is None:
+            quarantine_threshold = self._threshold_from_env()
+        self.quarantine_threshold = max(1, quarantine_threshold)
         
         # Ensure the directory exists
         os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
         
         # Initialize file if it doesn't exist
-        if not os.path.exists(self.storage_file):
-            self._save_data({})
+        with self.lock:
+            if not os.path.exists(self.storage_file):
+                self._save_data({})
+    
+    @classmethod
+    def _threshold_from_env(cls) -> int:
+        """Read KEY_QUARANTINE_THRESHOLD, falling back to the default if unset or invalid"""
+        value = os.environ.get('KEY_QUARANTINE_THRESHOLD')
+        if not value:
+            return cls.DEFAULT_QUARANTINE_THRESHOLD
+        try:
+            return int(value)
+        except ValueError:
+            logger.error(f"Invalid KEY_QUARANTINE_THRESHOLD {value!r}; using {cls.DEFAULT_QUARANTINE_THRESHOLD}")
+            return cls.DEFAULT_QUARANTINE_THRESHOLD
     
-    def _load_data(self) -> Dict[str, str]:
+    @classmethod
+    def _new_record(cls, api_key: str) -> Dict[str, Any]:
+        """Build a fresh storage record for an API key"""
+        return {
+            'api_key': api_key,
+            'status': cls.STATUS_UNVERIFIED,
+            'auth_failures': 0,
+            'last_error': None,
+            'last_checked': None
+        }
+    
+    def _load_data(self) -> Dict[str, Dict[str, Any]]:
         """Load user data from file"""
         try:
             with open(self.storage_file, 'r') as f:
-                return json.load(f)
+                data = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logger.warning(f"Error loading user data: {e}, returning empty dict")
             return {}
+        
+        # Older files map Discord IDs straight to API key strings
+        for discord_id, record in data.items():
+            if isinstance(record, str):
+                data[discord_id] = self._new_record(record)
+        return data
     
-    def _save_data(self, data: Dict[str, str]) -> None:
-        """Save user data to file"""
+    def _save_data(self, data: Dict[str, Dict[str, Any]]) -> None:
+        """Save user data to file atomically, so readers never see a partial write"""
+        directory = os.path.dirname(self.storage_file)
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.user_keys-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.storage_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
         except Exception as e:
             logger.error(f"Error saving user data: {e}")
             raise
@@ -57,7 +118,7 @@ class UserStorage:
         try:
             with self.lock:
                 data = self._load_data()
-                data[discord_id] = api_key
+                data[discord_id] = self._new_record(api_key)
                 self._save_data(data)
                 logger.info(f"Stored API key for user {discord_id}")
                 return True
@@ -78,7 +139,8 @@ class UserStorage:
         try:
             with self.lock:
                 data = self._load_data()
-                return data.get(discord_id)
+                record = data.get(discord_id)
+                return record['api_key'] if record else None
         except Exception as e:
             logger.error(f"Error getting API key for user {discord_id}: {e}")
             return None
@@ -117,11 +179,231 @@ class UserStorage:
         """
         try:
             with self.lock:
-                return self._load_data()
+                data = self._load_data()
+                return {discord_id: record['api_key'] for discord_id, record in data.items()}
         except Exception as e:
             logger.error(f"Error getting all users: {e}")
             return {}
     
+    def get_active_users(self) -> Dict[str, str]:
+        """
+        Get all users whose API keys are not quarantined
+        
+        Returns:
+            Dict mapping Discord IDs to API keys
+        """
+        try:
+            with self.lock:
+                data = self._load_data()
+                return {
+                    discord_id: record['api_key']
+                    for discord_id, record in data.items()
+                    if record['status'] != self.STATUS_QUARANTINED
+                }
+        except Exception as e:
+            logger.error(f"Error getting active users: {e}")
+            return {}
+    
+    def get_quarantined_users(self) -> Dict[str, str]:
+        """
+        Get all users whose API keys are quarantined
+        
+        Returns:
+            Dict mapping Discord IDs to API keys
+        """
+        try:
+            with self.lock:
+                data = self._load_data()
+                return {
+                    discord_id: record['api_key']
+                    for discord_id, record in data.items()
+                    if record['status'] == self.STATUS_QUARANTINED
+                }
+        except Exception as e:
+            logger.error(f"Error getting quarantined users: {e}")
+            return {}
+    
+    def get_key_status(self, discord_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the health record of a user's API key
+        
+        Args:
+            discord_id: User's Discord ID
+            
+        Returns:
+            Dict with status, auth_failures, last_error and last_checked,
+            or None if the user has no key stored
+        """
+        try:
+            with self.lock:
+                record = self._load_data().get(discord_id)
+                if record is None:
+                    return None
+                return {k: v for k, v in record.items() if k != 'api_key'}
+        except Exception as e:
+            logger.error(f"Error getting key status for user {discord_id}: {e}")
+            return None
+    
+    def _apply_success(self, record: Dict[str, Any]) -> Tuple[bool, bool]:
+        """
+        Mark a record valid
+        
+        Returns:
+            (changed, was_quarantined)
+        """
+        if record['status'] == self.STATUS_VALID and not record['auth_failures'] and record['last_error'] is None:
+            # Already healthy; nothing to write
+            return False, False
+        was_quarantined = record['status'] == self.STATUS_QUARANTINED
+        record.update({
+            'status': self.STATUS_VALID,
+            'auth_failures': 0,
+            'last_error': None,
+            'last_checked': time.time()
+        })
+        return True, was_quarantined
+    
+    def _apply_failure(self, discord_id: str, record: Dict[str, Any], error: str, auth_failure: bool) -> bool:
+        """
+        Record a failure on a record
+        
+        Returns:
+            True if the record was newly quarantined
+        """
+        record['last_error'] = error
+        record['last_checked'] = time.time()
+        if not auth_failure:
+            return False
+        
+        record['auth_failures'] += 1
+        if (record['status'] != self.STATUS_QUARANTINED
+                and record['auth_failures'] >= self.quarantine_threshold):
+            record['status'] = self.STATUS_QUARANTINED
+            logger.warning(f"Quarantined API key for user {discord_id} after "
+                           f"{record['auth_failures']} auth failures: {error}")
+            return True
+        return False
+    
+    def record_key_success(self, discord_id: str) -> bool:
+        """
+        Mark a user's API key as valid after a successful API call
+        
+        A quarantined key that authenticates again is restored.
+        
+        Args:
+            discord_id: User's Discord ID
+            
+        Returns:
+            True if the key was previously quarantined, False otherwise
+        """
+        try:
+            with self.lock:
+                data = self._load_data()
+                record = data.get(discord_id)
+                if record is None:
+                    return False
+                
+                changed, was_quarantined = self._apply_success(record)
+                if changed:
+                    self._save_data(data)
+                if was_quarantined:
+                    logger.info(f"Restored quarantined API key for user {discord_id}")
+                return was_quarantined
+        except Exception as e:
+            logger.error(f"Error recording key success for user {discord_id}: {e}")
+            return False
+    
+    def record_key_failure(self, discord_id: str, error: str, auth_failure: bool = True) -> bool:
+        """
+        Record a failed API call for a user's API key
+        
+        Only auth failures count towards quarantine; other errors are just
+        remembered as the last error.
+        
+        Args:
+            discord_id: User's Discord ID
+            error: Error message returned by the API
+            auth_failure: Whether the failure was an authentication error (401/403)
+            
+        Returns:
+            True if this failure caused the key to be quarantined, False otherwise
+        """
+        try:
+            with self.lock:
+                data = self._load_data()
+                record = data.get(discord_id)
+                if record is None:
+                    return False
+                
+                newly_quarantined = self._apply_failure(discord_id, record, error, auth_failure)
+                self._save_data(data)
+                return newly_quarantined
+        except Exception as e:
+            logger.error(f"Error recording key failure for user {discord_id}: {e}")
+            return False
+    
+    def record_key_results(self, successes: Iterable[str],
+                           failures: Dict[str, Tuple[str, bool]]) -> Dict[str, List[str]]:
+        """
+        Apply the outcomes of a whole fan-out with a single read and write
+        
+        Args:
+            successes: Discord IDs whose API calls succeeded
+            failures: Discord ID -> (error message, whether it was an auth failure)
+            
+        Returns:
+            Dict with the Discord IDs whose keys were newly 'quarantined' and
+            those whose quarantined keys were 'restored'
+        """
+        try:
+            with self.lock:
+                data = self._load_data()
+                changed = False
+                quarantined = []
+                restored = []
+                
+                for discord_id in successes:
+                    record = data.get(discord_id)
+                    if record is None:
+                        continue  # Key removed during the fan-out
+                    record_changed, was_quarantined = self._apply_success(record)
+                    changed = changed or record_changed
+                    if was_quarantined:
+                        restored.append(discord_id)
+                        logger.info(f"Restored quarantined API key for user {discord_id}")
+                
+                for discord_id, (error, auth_failure) in failures.items():
+                    record = data.get(discord_id)
+                    if record is None:
+                        continue
+                    changed = True
+                    if self._apply_failure(discord_id, record, error, auth_failure):
+                        quarantined.append(discord_id)
+                
+                if changed:
+                    self._save_data(data)
+                return {'quarantined': quarantined, 'restored': restored}
+        except Exception as e:
+            logger.error(f"Error recording key results: {e}")
+            return {'quarantined': [], 'restored': []}
+    
+    def ping(self) -> int:
+        """
+        Read and parse the storage file without swallowing errors, for health checks
+        
+        Returns:
+            Number of stored users
+            
+        Raises:
+            OSError or ValueError if the file can't be read or isn't valid JSON
+        """
+        with self.lock:
+            with open(self.storage_file, 'r') as f:
+                data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("User storage file does not contain a JSON object")
+        return len(data)
+    
     def user_exists(self, discord_id: str) -> bool:
         """
         Check if a user has an API key stored